@@ -1,21 +1,110 @@
 import numpy as np
-import networkx as nx
-from scipy.special import binom
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 from skimage import measure
 import sys
 import itertools
+import multiprocessing
 import time
 
+#offsets from a cube to the six cubes it shares a face with
+FACE_OFFSETS = np.array([(1,0,0), (-1,0,0), (0,1,0), (0,-1,0), (0,0,1), (0,0,-1)], dtype=np.int8)
+
+#number of polycubes grown at once, bounds the memory used by each step
+GROW_BATCH_SIZE = 256
+
+#permutations and reflections of the coordinates that make up the 8 symmetries
+#  of the dihedral group of order 8 (D8) on the xy-plane
+D8_PERMUTATIONS = np.array([(0,1,2)]*4 + [(1,0,2)]*4)
+D8_REFLECTIONS = np.array([(rX, rY, 0) for rX, rY in [(0,0), (0,1), (1,0), (1,1)]]*2, dtype=bool)
+
+#same for the 48 symmetries of the octahedral group with reflections (O48)
+O48_PERMUTATIONS = np.repeat(list(itertools.permutations(range(3))), 8, axis=0)
+O48_REFLECTIONS = np.array(list(itertools.product((0,1), repeat=3))*6, dtype=bool)
+
+
+#side length of the cubic grid polycubes are packed into
+GRID_DIM = 5
+
+
+def grid_index(x, y, z):
+    '''
+    index of cell (x, y, z) in the grid, which is also
+        its bit in a grid bitmask
+    
+    Parameters
+    ----------
+    x,y,z   :   int
+        cell coordinates in [0, GRID_DIM)
+    
+    Returns
+    -------
+    int
+        index of the cell
+    '''
+    return (x*GRID_DIM + y)*GRID_DIM + z
+
+
+#cells of the grid that share a face with each cell
+GRID_NEIGHBORS = [[grid_index(x+dx, y+dy, z+dz) for dx, dy, dz in FACE_OFFSETS.tolist()
+                   if all(0 <= v < GRID_DIM for v in (x+dx, y+dy, z+dz))]
+                  for x, y, z in itertools.product(range(GRID_DIM), repeat=3)]
+
+
+#cells of the grid that have a neighbor in the +/- y and z directions
+#  (x shifts run off the ends of the bitmask on their own)
+GRID_HAS_Y_PLUS = sum(1 << grid_index(x, y, z) for x, y, z in itertools.product(range(GRID_DIM), repeat=3) if y < GRID_DIM-1)
+GRID_HAS_Y_MINUS = sum(1 << grid_index(x, y, z) for x, y, z in itertools.product(range(GRID_DIM), repeat=3) if y > 0)
+GRID_HAS_Z_PLUS = sum(1 << grid_index(x, y, z) for x, y, z in itertools.product(range(GRID_DIM), repeat=3) if z < GRID_DIM-1)
+GRID_HAS_Z_MINUS = sum(1 << grid_index(x, y, z) for x, y, z in itertools.product(range(GRID_DIM), repeat=3) if z > 0)
+
+
+def grid_neighbors(cells):
+    '''
+    finds every grid cell that shares a face with a cell in the bitmask
+    
+    Parameters
+    ----------
+    cells   :   int
+        bitmask of grid cells
+    
+    Returns
+    -------
+    int
+        bitmask of the face neighbors (may include bits past the grid)
+    '''
+    return ((cells << GRID_DIM**2) | (cells >> GRID_DIM**2) |
+            ((cells & GRID_HAS_Y_PLUS) << GRID_DIM) | ((cells & GRID_HAS_Y_MINUS) >> GRID_DIM) |
+            ((cells & GRID_HAS_Z_PLUS) << 1) | ((cells & GRID_HAS_Z_MINUS) >> 1))
+
+
+#rows of pascal's triangle built so far, PASCAL[n][k] is binom(n, k)
+PASCAL = []
+
+
+def binomial(n, k):
+    '''
+    binom(n, k) in exact integer arithmetic, read from
+        pascal's triangle after extending it to row n if needed
+    
+    Parameters
+    ----------
+    n   :   int
+        size of the set
+    k   :   int
+        size of the subset
+    
+    Returns
+    -------
+    int
+        number of k-subsets of n elements
+    '''
+    while len(PASCAL) <= n:
+        row = PASCAL[-1] if PASCAL else []
+        PASCAL.append([1] + [row[i-1] + row[i] for i in range(1, len(row))] + [1] if row else [1])
+    
+    return PASCAL[n][k] if 0 <= k <= n else 0
 
-def memoize(f):
-    memo = {}
-    def helper(x, y):
-        try:
-            return memo[(x,y)]
-        except:
-            memo[(x,y)] = f(x, y)
-            return memo[(x,y)]
-    return helper
 
 def memoize2(f):
     memo = {}
@@ -27,10 +116,6 @@ def memoize2(f):
             return memo[(x,y)]
     return helper
 
-@memoize
-def binomial(n,k):
-    return int(binom(n,k))
-
 
 def num_regions(p):
     '''
@@ -48,9 +133,9 @@ def num_regions(p):
     '''
     A = polycube_to_graph(p, len(p))
     
-    G = nx.from_numpy_matrix(A)
+    numComponents, _ = connected_components(csr_matrix(A), directed=False)
     
-    return nx.number_connected_components(G)
+    return numComponents
 
 
 def is_connected(p):
@@ -67,11 +152,34 @@ def is_connected(p):
     bool
         True if there is only one component
     '''
-    A = polycube_to_graph(p, len(p))
+    if len(p) == 0:
+        return False
     
-    G = nx.from_numpy_matrix(A)
+    P = np.asarray(p, dtype=np.int64).reshape(-1, 3)
     
-    return nx.is_connected(G)
+    #translate the structure to the origin
+    P -= P.min(0)
+    
+    #structures that don't fit in the grid fall back to a graph search
+    if P.max() >= GRID_DIM:
+        return num_regions(p) == 1
+    
+    #pack the cubes into a bitmask over the grid
+    cells = 0
+    for cell in grid_index(P[:, 0], P[:, 1], P[:, 2]).tolist():
+        cells |= 1 << cell
+    
+    #flood fill from the lowest cube, one layer of face neighbors at a time
+    frontier = cells & -cells
+    remaining = cells & ~frontier
+    
+    while frontier:
+        
+        new = grid_neighbors(frontier) & remaining
+        remaining &= ~new
+        frontier = new
+    
+    return remaining == 0
 
 @memoize2
 def convert_to_base(b, num):
@@ -92,10 +200,32 @@ def convert_to_base(b, num):
         num in base b
     '''
 
-    if num < b:
-        return str(num)
-    else:
-        return convert_to_base(b, num//b) + str(num%b)
+    return ''.join(str(d) for d in base_digits(b, num))
+
+
+def base_digits(b, num):
+    '''
+    digits of num in base b, most significant first
+    
+    Parameters
+    ----------
+    b   :   int
+        base to convert to
+    num :   int
+        number to convert
+    
+    Returns
+    -------
+    list
+        integer digits of num in base b
+    '''
+    digits = []
+    
+    while num:
+        num, d = divmod(num, b)
+        digits.append(d)
+    
+    return digits[::-1] or [0]
     
 
 def unrank_kSubset(r, k, n):
@@ -121,12 +251,14 @@ def unrank_kSubset(r, k, n):
         
     for i in range(1,k+1):
         
-        c = binomial(n, k+1-i)
+        j = k+1-i
+        c = binomial(n, j)
             
         while c > r:
             
+            #binom(n-1, j) from binom(n, j) in exact integer arithmetic
+            c = c*(n-j)//n
             n -= 1
-            c = binomial(n, k+1-i)
             
         T[i-1] = n
         r -= c
@@ -149,20 +281,39 @@ def checkTree(edgeList, n):
     bool
         True if edgeList defines a tree
     '''
-    A = np.zeros((n,n))
+    #a tree on n nodes has exactly n-1 edges
+    if len(edgeList) != n-1:
+        return False
+    
+    #union-find over the nodes, n-1 edges without a cycle make a tree
+    parent = list(range(n))
     
-    for edge in edgeList:
-        A[edge] = 1
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
     
-    G = nx.from_numpy_matrix(A)
+    for u,v in edgeList:
+        
+        ru, rv = find(u), find(v)
+        
+        if ru == rv:
+            return False
+        
+        parent[ru] = rv
     
-    return nx.is_tree(G)
+    return True
     
     
 def brute_force_trees(n, E):
     '''
     Brute force search through all (n-1)-subsets in (E)
     
+    Subsets are built one edge at a time in the order of E, with a
+        union-find over the nodes. An edge that would close a cycle is
+        never added, so every superset of a cyclic prefix is skipped.
+    
     Parameters
     ----------
     n   :   int
@@ -180,25 +331,170 @@ def brute_force_trees(n, E):
     
     m = len(E)
     
-    numSubsets = binomial(m, n-1)
+    if n < 1:
+        return validTrees
     
-    for i in range(numSubsets):
-        
-        subset = unrank_kSubset(i, n-1, m)
+    #union-find without path compression, so unions can be undone
+    parent = list(range(n))
+    
+    def find(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+    
+    def extend(idx, edgeSubset):
         
-        edgeSubset = []
+        if len(edgeSubset) == n-1:
+            validTrees.append(list(edgeSubset))
+            return
         
-        for j in subset[::-1]:
+        #leave enough edges to fill the rest of the subset
+        for j in range(idx, m - (n-1-len(edgeSubset)) + 1):
+            
+            u, v = E[j]
+            ru, rv = find(u), find(v)
             
+            #E[j] closes a cycle
+            if ru == rv:
+                continue
+            
+            parent[ru] = rv
             edgeSubset.append(E[j])
             
-        if checkTree(edgeSubset, n):
+            extend(j+1, edgeSubset)
+            
+            edgeSubset.pop()
+            parent[ru] = ru
+    
+    extend(0, [])
         
-            validTrees.append(edgeSubset)
+    return validTrees
+
+
+def enumerate_spanning_trees(n, E):
+    '''
+    Reverse search through the spanning trees of the graph (n, E)
+    
+    Every spanning tree other than a fixed BFS tree T0 has a parent tree,
+        gotten by adding back the first missing edge of T0 and removing
+        the last edge outside of T0 on the cycle that closes. Starting
+        at T0, the search visits each tree's children by swapping one
+        edge at a time, so every spanning tree is produced exactly once
+        and no non-tree subsets are ever tested.
+    
+    Parameters
+    ----------
+    n   :   int
+        Number of nodes (cubes)
+    E   :   list
+        edge list of the graph
         
+    Returns
+    -------
+    list
+        list containing the edge lists of the spanning trees
+    '''
+    
+    validTrees = []
+    
+    m = len(E)
+    
+    adjacency = [[] for _ in range(n)]
+    for idx, (u, v) in enumerate(E):
+        adjacency[u].append((v, idx))
+        adjacency[v].append((u, idx))
+    
+    #BFS tree from node 0 is the root of the search
+    visited = {0}
+    queue = [0]
+    rootEdges = []
+    for u in queue:
+        for v, idx in adjacency[u]:
+            if v not in visited:
+                visited.add(v)
+                rootEdges.append(idx)
+                queue.append(v)
+    
+    #a disconnected graph has no spanning trees
+    if len(visited) != n:
+        return validTrees
+    
+    #relabel the edges so that T0 is edges 0 through n-2
+    rootSet = set(rootEdges)
+    order = sorted(rootEdges) + [idx for idx in range(m) if idx not in rootSet]
+    edges = [E[idx] for idx in order]
+    t = n-1
+    
+    def tree_path(tree, a, b):
+        #edges on the path from a to b in the tree
+        treeAdjacency = [[] for _ in range(n)]
+        for e in tree:
+            u, v = edges[e]
+            treeAdjacency[u].append((v, e))
+            treeAdjacency[v].append((u, e))
+        
+        via = {a: None}
+        queue = [a]
+        for u in queue:
+            for v, e in treeAdjacency[u]:
+                if v not in via:
+                    via[v] = (u, e)
+                    queue.append(v)
+        
+        path = []
+        while via[b] is not None:
+            b, e = via[b]
+            path.append(e)
+        return path
+    
+    def search(tree, missing):
+        #missing is the first edge of T0 that is not in the tree
+        validTrees.append([E[order[e]] for e in sorted(tree, key=lambda e: order[e])])
+        
+        for h in range(t, m):
+            
+            if h in tree:
+                continue
+            
+            #adding h closes a cycle, h has to be its last edge outside of T0
+            path = tree_path(tree, *edges[h])
+            if any(f > h for f in path if f >= t):
+                continue
+            
+            #swapping out an earlier T0 edge on the cycle gives a child
+            for g in path:
+                if g < missing:
+                    search((tree - {g}) | {h}, g)
+    
+    search(set(range(t)), t)
+    
     return validTrees
 
 
+def count_spanning_trees(A):
+    '''
+    counts the spanning trees of a graph with
+        Kirchhoff's matrix-tree theorem
+    
+    Parameters
+    ----------
+    A   :   numpy 2-d array
+        adjacency matrix of the graph
+        
+    Returns
+    -------
+    int
+        number of spanning trees of the graph
+    '''
+    #laplacian matrix
+    L = np.diag(A.sum(1)) - A
+    
+    #any cofactor of the laplacian is the number of spanning trees
+    Q_star = L[1:, 1:]
+    
+    return int(round(np.linalg.det(Q_star)))
+
+
 def check_all_isomorphism(p1, p2):
     """
     Performs all 48 symmetries on polycube2 (p2)
@@ -209,9 +505,9 @@ def check_all_isomorphism(p1, p2):
     
     Parameters
     ----------
-    p1  :   list
+    p1  :   list or numpy 2-d array
         cube coordinates
-    p2  :   list
+    p2  :   list or numpy 2-d array
         cube coordinates
         
     Returns
@@ -220,66 +516,7 @@ def check_all_isomorphism(p1, p2):
         True if p1 and p2 are isomorphic under O48 symmetries
     """
     
-    #use p1 as the comparison
-    fixedCoordinates = set(p1)
-    
-    #get all coordinates
-    coordinateSet = p2
-    
-    #get all x coordinates in a list, all y in a list, all z in a list
-    coordinatesSplit = list(zip(*coordinateSet))
-    
-    #offset to reflect each coordinate by 
-    reflectPoints = [max(coor) for coor in coordinatesSplit]
-    
-    coorReflect = list(itertools.product('01', repeat=3))
-    
-    permutations = list(itertools.permutations('012'))
-    
-    #check each permutation of the coordinates
-    for permute in permutations:
-        
-        #permutation indices
-        i,j,k = permute[0], permute[1], permute[2]
-        i = int(i)
-        j = int(j)
-        k = int(k)
-        
-        #get reflection args
-        a,b,c = reflectPoints[i], reflectPoints[j], reflectPoints[k]
-        
-        #check each possible reflection of each coordinate
-        for reflect in coorReflect:
-            
-            rX = int(reflect[0])
-            rY = int(reflect[1])
-            rZ = int(reflect[2])
-            
-            newCoordSet = set()
-            
-            for coord in coordinateSet:
-                
-                #permute the coordinates
-                x,y,z = coord[i], coord[j], coord[k]
-                
-                #reflect the coordinates
-                if rX:
-                    x = a-x
-                if rY:
-                    y = b-y
-                if rZ:
-                    z = c-z
-                
-                #add new coordinate under the map
-                newCoord = (x, y, z)
-                newCoordSet.add(newCoord)
-            
-            #check if mapping equals the comparison set
-            if newCoordSet == fixedCoordinates:
-                return True
-            
-    #at this point, none match
-    return False
+    return check_isomorphism(p1, p2, O48_PERMUTATIONS, O48_REFLECTIONS)
 
 
 def check_poly_isomorphism(p1, p2):
@@ -292,9 +529,9 @@ def check_poly_isomorphism(p1, p2):
         
     Parameters
     ----------
-    p1  :   list
+    p1  :   list or numpy 2-d array
         cube coordinates
-    p2  :   list
+    p2  :   list or numpy 2-d array
         cube coordinates
         
     Returns
@@ -303,72 +540,282 @@ def check_poly_isomorphism(p1, p2):
         True if p1 and p2 are isomorphic under D8 symmetries in xy-plane
     """
     
+    return check_isomorphism(p1, p2, D8_PERMUTATIONS, D8_REFLECTIONS)
+
+
+def check_isomorphism(p1, p2, permutations, reflections):
+    """
+    Performs the given symmetries on polycube2 (p2)
+        and checks if any image equals polycube1 (p1) up to translation
+        
+    Parameters
+    ----------
+    p1              :   list or numpy 2-d array
+        cube coordinates
+    p2              :   list or numpy 2-d array
+        cube coordinates
+    permutations    :   numpy 2-d array
+        coordinate order of each symmetry, shape (S, 3)
+    reflections     :   numpy 2-d array
+        coordinates each symmetry reflects, shape (S, 3)
+        
+    Returns
+    -------
+    bool
+        True if some symmetry maps p2 onto p1
+    """
+    
     #use p1 as the comparison
-    fixedCoordinates = set(p1)
+    P1 = np.asarray(p1, dtype=np.int64).reshape(-1, 3)
+    P2 = np.asarray(p2, dtype=np.int64).reshape(-1, 3)
+    
+    if len(P1) != len(P2):
+        return False
     
-    #get all coordinates
-    coordinateSet = p2
+    if len(P1) == 0:
+        return True
     
-    #get all x coordinates in a list, all y in a list, all z in a list
-    coordinatesSplit = list(zip(*coordinateSet))
+    #translate p1 to the origin like every image of p2
+    P1 = P1 - P1.min(0)
     
-    #offset to reflect each coordinate by 
-    reflectPoints = [max(coor) for coor in coordinatesSplit]
+    #all images of p2, each at the origin
+    T = apply_symmetries(P2, permutations, reflections)
     
-    #symmetries only on x and y
-    #coorReflect = list(itertools.product('01', repeat=2))
-    #permutations = list(itertools.permutations('01'))
-    coorReflect = [(0,0), (0,1), (1,0), (1,1)]
-    permutations = [(0,1), (1,0)]
+    base = max(T.max(), P1.max()) + 1
     
-    #check each permutation of the coordinates
-    for permute in permutations:
+    #check if any mapping equals the comparison set
+    return bool((encode_cubes(T, base) == encode_cubes(P1, base)).all(-1).any())
+
+
+def apply_symmetries(P, permutations, reflections):
+    """
+    Applies coordinate permutations and reflections to polycubes
+        and translates each image back to the origin
+        
+    Parameters
+    ----------
+    P               :   numpy array
+        cube coordinates, shape (..., N, 3)
+    permutations    :   numpy 2-d array
+        coordinate order of each symmetry, shape (S, 3)
+    reflections     :   numpy 2-d array
+        coordinates each symmetry reflects, shape (S, 3)
         
-        #permutation indices
-        i,j = permute[0], permute[1]
+    Returns
+    -------
+    numpy array
+        images of the polycubes, shape (..., S, N, 3)
+    """
+    
+    #permute the coordinates
+    T = np.moveaxis(np.take(P, permutations, axis=-1), -2, -3)
+    
+    #reflect the coordinates
+    T = np.where(reflections[:, None, :], -T, T)
+    
+    #this handles translational symmetries
+    return T - T.min(-2, keepdims=True)
+
+
+def encode_cubes(P, base):
+    """
+    Encodes each cube as one integer and sorts them, so two sets of
+        cubes are equal exactly when their codes are
         
-        #get reflection args
-        a,b = reflectPoints[i], reflectPoints[j]
+    Parameters
+    ----------
+    P       :   numpy array
+        cube coordinates in [0, base), shape (..., N, 3)
+    base    :   int
+        bound on the coordinates
         
-        #check each possible reflection of each coordinate
-        for reflect in coorReflect:
-            
-            rX, rY = reflect[0], reflect[1]
-            
-            newCoordSet = set()
-            
-            for coord in coordinateSet:
-                
-                #permute x and y coordinates
-                x,y,z = coord[i], coord[j], coord[2]
-                
-                #reflect the coordinates
-                if rX:
-                    x = a-x
-                if rY:
-                    y = b-y
-                
-                #add new coordinate under the map
-                newCoord = (x, y, z)
-                newCoordSet.add(newCoord)
-            
-            #check if mapping equals the comparison set
-            if newCoordSet == fixedCoordinates:
-                return True
-            
-    #at this point, none match
-    return False
+    Returns
+    -------
+    numpy array
+        sorted cube codes, shape (..., N)
+    """
+    P = P.astype(np.int64)
+    
+    codes = (P[..., 0]*base + P[..., 1])*base + P[..., 2]
+    codes.sort(-1)
+    
+    return codes
+
+
+def canonical_codes(P, base):
+    """
+    Computes the canonical forms of a stack of polycubes as sorted
+        cube codes (see canonical_poly)
+        
+    Parameters
+    ----------
+    P       :   numpy array
+        cube coordinates, shape (..., N, 3)
+    base    :   int
+        bound on the coordinates of every image of the polycubes
+        
+    Returns
+    -------
+    numpy array
+        cube codes of the canonical forms, shape (..., N)
+    """
+    
+    codes = encode_cubes(apply_symmetries(P, D8_PERMUTATIONS, D8_REFLECTIONS), base)
+    
+    #narrow down to the lexicographically smallest image, one cube at a time
+    smallest = np.ones(codes.shape[:-1], dtype=bool)
+    for i in range(codes.shape[-1]):
+        column = np.where(smallest, codes[..., i], np.iinfo(np.int64).max)
+        smallest &= column == column.min(-1, keepdims=True)
+    
+    index = smallest.argmax(-1)[..., None, None]
+    
+    return np.take_along_axis(codes, index, -2)[..., 0, :]
+
 
+def decode_cubes(codes, base):
+    """
+    Inverse of encode_cubes
+        
+    Parameters
+    ----------
+    codes   :   numpy array
+        cube codes, shape (..., N)
+    base    :   int
+        bound on the coordinates
+        
+    Returns
+    -------
+    numpy array
+        cube coordinates, shape (..., N, 3)
+    """
+    return np.stack([codes//base**2, codes//base % base, codes % base], -1).astype(np.int8)
 
-def get_polycubes_of_size(k):
+
+def canonical_poly(p):
+    """
+    Computes a canonical form of polycube p under the 8 symmetries
+        of the dihedral group of order 8 (D8) in the xy-plane
+        
+    Two polycubes are isomorphic under check_poly_isomorphism exactly
+        when their canonical forms are equal, so the form can be used
+        as a hash key
+        
+    Parameters
+    ----------
+    p   :   list or numpy 2-d array
+        cube coordinates
+        
+    Returns
+    -------
+    tuple
+        lexicographically smallest sorted coordinate tuple over all
+        D8 symmetries, translated to the origin
+    """
+    
+    P = np.asarray(p, dtype=np.int64).reshape(-1, 3)
+    
+    base = int((P.max(0) - P.min(0)).max()) + 1
+    
+    canonical = decode_cubes(canonical_codes(P, base), base)
+    
+    return tuple(map(tuple, canonical.tolist()))
+
+
+def grow(P):
+    '''
+    finds every empty cell that shares a face with a polycube in P
+    
+    Parameters
+    ----------
+    P   :   numpy 3-d array
+        cube coordinates of L polycubes, shape (L, N, 3)
+    
+    Returns
+    -------
+    numpy 1-d array
+        index of the polycube each cell is attached to
+    numpy 2-d array
+        coordinates of the cells a new cube can be attached at
+    '''
+    
+    #neighbors of every cube, shape (L, 6N, 3)
+    cells = (P[:, :, None, :] + FACE_OFFSETS).reshape(len(P), -1, 3)
+    
+    occupied = (cells[:, :, None, :] == P[:, None, :, :]).all(-1).any(-1)
+    
+    index, cell = np.nonzero(~occupied)
+    
+    return index, cells[index, cell]
+
+
+def grow_batch(level, boxDim):
+    '''
+    grows every polycube in level by one cube, all at once
+    
+    Parameters
+    ----------
+    level   :   numpy 3-d array
+        cube coordinates of L polycubes of size n, shape (L, n, 3)
+    boxDim  :   int
+        side length of the bounding box
+    
+    Returns
+    -------
+    numpy 2-d array
+        unique cube codes (base n+1) of the canonical forms of the children
+    '''
+    n = level.shape[1]
+    
+    index, cubes = grow(level)
+    
+    #the structure has to fit in the bounding box
+    lows = level.min(1)[index]
+    highs = level.max(1)[index]
+    fits = (np.maximum(highs, cubes) - np.minimum(lows, cubes) < boxDim).all(-1)
+    
+    children = np.concatenate([level[index[fits]], cubes[fits, None, :]], 1)
+    
+    #a connected structure of n+1 cubes is at most n+1 cells wide
+    return np.unique(canonical_codes(children, n+1), axis=0)
+
+
+def grow_level(level, boxDim):
+    '''
+    grows every polycube in level by one cube, GROW_BATCH_SIZE
+        polycubes at a time so memory stays bounded
+    
+    Parameters
+    ----------
+    level   :   numpy 3-d array
+        cube coordinates of L polycubes of size n, shape (L, n, 3)
+    boxDim  :   int
+        side length of the bounding box
+    
+    Returns
+    -------
+    numpy 2-d array
+        unique cube codes (base n+1) of the canonical forms of the children
+    '''
+    batches = [grow_batch(level[i:i+GROW_BATCH_SIZE], boxDim)
+               for i in range(0, len(level), GROW_BATCH_SIZE)]
+    
+    #batches are deduped on their own, duplicates across batches are merged here
+    return np.unique(np.concatenate(batches), axis=0)
+
+
+def get_polycubes_of_size(k, processes=1):
     '''
     finds all polycube structures of size k that
         exists in a 5x5x5 bounding box
     
     Parameters
     ----------
-    k   :   int
+    k           :   int
         Number of polycubes
+    processes   :   int
+        number of worker processes to split each level of the growth
+        between (1 grows in the calling process)
     
     Returns
     -------
@@ -376,46 +823,38 @@ def get_polycubes_of_size(k):
         list that contains lists of polycube cube coordinates
     '''
     
+    #there are no polycubes without cubes
+    if k < 1:
+        return []
+    
     boxDim  = min(5, k)
-    boxSize = boxDim**3
     
-    totalPossibilities = binomial(boxSize, k)
+    #grow every polycube of size n-1 by one cube to get those of size n,
+    #  keeping one canonical form per isomorphism class
+    level = np.zeros((1, 1, 3), dtype=np.int8)
     
-    returnUnique = []
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
     
-    for r in range(totalPossibilities):
-        
-        #get a list of coordinate ranks in base 10
-        coordinateRanks = unrank_kSubset(r=r, k=k, n=boxSize)
-        
-        #convert coordinates ranks to base k (coordinates in bounding box)
-        coordinateStrings = [convert_to_base(boxDim, x).zfill(3) for x in coordinateRanks]
-        
-        #split string into integer coordinates 
-        coordinates = [tuple([int(x) for x in str]) for str in coordinateStrings]
-        
-        #we want one connected component
-        if not is_connected(coordinates):
-            continue
-        
-        #this handles translational symmetries
-        minX = min(coordinates, key=lambda x: x[0])[0]
-        minY = min(coordinates, key=lambda x: x[1])[1]
-        minZ = min(coordinates, key=lambda x: x[2])[2]
-        coordinates = [(x[0]-minX, x[1]-minY, x[2]-minZ) for x in coordinates]
-        
-        #check against previously added polycubes
-        unique = True
-        for alreadyAdded in returnUnique:
-            if check_poly_isomorphism(alreadyAdded, coordinates):
-                #if isomorphic, skip
-                unique = False
-                break         
-        
-        if unique:
-            returnUnique.append(coordinates)
-        
-    return returnUnique
+    try:
+        for n in range(1, k):
+            
+            if pool is None:
+                codes = grow_level(level, boxDim)
+            else:
+                #workers grow and dedupe the same batches grow_level uses,
+                #  duplicates across batches are merged here
+                batches = ((level[i:i+GROW_BATCH_SIZE], boxDim) for i in range(0, len(level), GROW_BATCH_SIZE))
+                results = pool.starmap(grow_batch, batches)
+                codes = np.unique(np.concatenate(results), axis=0)
+            
+            level = decode_cubes(codes, n+1)
+            
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    
+    return [list(map(tuple, polycube.tolist())) for polycube in level]
 
 
 def matrix_minor(A, r, c):
@@ -436,13 +875,15 @@ def matrix_minor(A, r, c):
     numpy 2-d array
         adjacency matrix after deletions
     '''
-    #delete row
-    Ar = np.delete(A, r, 0)
+    #keep every row but r and every column but c
+    rows = np.ones(A.shape[0], dtype=bool)
+    rows[r] = False
     
-    #delete column
-    Arc = np.delete(Ar, c, 1)
+    columns = np.ones(A.shape[1], dtype=bool)
+    columns[c] = False
     
-    return Arc
+    #one fancy index makes one copy, instead of one per deletion
+    return A[np.ix_(rows, columns)]
 
 
 def taxi_distance(v1, v2):
@@ -489,45 +930,57 @@ def polycube_to_graph(p, n):
     numpy 2-d array
         adjacency matrix of the cubes
     '''
-    A = np.zeros((n, n))
+    P = np.asarray(p, dtype=np.int64).reshape(n, 3)
+    
+    #translate the structure to the origin
+    if n:
+        P = P - P.min(0)
+    
+    fits = n == 0 or (0 <= P.min() and P.max() < GRID_DIM)
+    
+    #node of the cube in each occupied grid cell
+    if fits:
+        nodes = {grid_index(x, y, z): i for i, (x, y, z) in enumerate(P.tolist())}
+    
+    #structures that don't fit in the grid, or repeat a cube, compare every pair of cubes
+    if not fits or len(nodes) != n:
+        
+        #pairwise taxi cab distances between every pair of cubes
+        D = np.abs(P[:, None, :] - P[None, :, :]).sum(-1)
+        
+        return (D == 1).astype(np.int8)
+    
+    A = np.zeros((n, n), dtype=np.int8)
     
-    for i in range(n):
-        for j in range(n):
-            if taxi_distance(p[i], p[j]) == 1:
-                A[i, j] = 1
+    for cell, i in nodes.items():
+        for neighbor in GRID_NEIGHBORS[cell]:
+            if neighbor in nodes:
+                A[i, nodes[neighbor]] = 1
     
     return A
     
 
-def get_edge_list(G):
+def get_edge_list(A):
     '''
-    Returns an edge list of the given graph
+    Returns an edge list of the graph with the given adjacency matrix
     
     Parameters
     ----------
-    G   :   networkx graph object
-        graph to find the edge list of
+    A   :   numpy 2-d array
+        adjacency matrix of the graph
         
     Returns
     -------
     list
         edge list where edges are 2-tuples of ints
     '''
-    edges = []
+    #each edge once, from the upper triangle
+    i, j = np.nonzero(np.triu(A, 1))
     
-    for line in nx.generate_edgelist(G):
-        
-        line = line.split()
-        
-        x = int(line[0])
-        y = int(line[1])
-        
-        edges.append((x, y))
-        
-    return edges    
+    return list(zip(i.tolist(), j.tolist()))
          
     
-def main(test):
+def main(test, listTrees=False):
     
     d1 = [(0,0,0), 
           (0,0,1),
@@ -580,7 +1033,7 @@ def main(test):
         numCubes = int(test)
         
         begin = time.time()
-        listOfPolycubes = get_polycubes_of_size(numCubes)
+        listOfPolycubes = get_polycubes_of_size(numCubes, multiprocessing.cpu_count())
         
         print('Number of Structures Found: %d'%len(listOfPolycubes))
         
@@ -588,17 +1041,14 @@ def main(test):
         print('-------------------------------------')
         for polycube in listOfPolycubes:
             
-            #kirchoff's matrix-tree theorem to count 
-            # #number of spanning trees
             A = polycube_to_graph(polycube, numCubes)
-            G = nx.from_numpy_matrix(A)
-            #Q = nx.laplacian_matrix(G).todense()
-            #Q_star = matrix_minor(Q, 1, 1)
-            #numTrees = int(np.linalg.det(Q_star))
+            numTrees = count_spanning_trees(A)
             
-            edges = get_edge_list(G)
-            trees = brute_force_trees(numCubes, edges)
-            numTrees = len(trees)
+            if listTrees:
+                edges = get_edge_list(A)
+                trees = enumerate_spanning_trees(numCubes, edges)
+            else:
+                trees = '-'
             
             print(polycube, ':      ', numTrees, ':      ', trees)
 
@@ -609,4 +1059,7 @@ if __name__ == '__main__':
     
     test = sys.argv[1]
     
-    main(test)
\ No newline at end of file
+    #only list the spanning trees themselves when asked to
+    listTrees = '--enumerate' in sys.argv[2:]
+    
+    main(test, listTrees)
\ No newline at end of file
@@ -10,7 +10,6 @@ import numpy as np
 import pickle
 import os
 import sys
-from copy import deepcopy
 
 from time import time
 
@@ -50,7 +49,7 @@ else:
     print("evolving for maximum fitness")
 
 def GetNewController():
-    return np.random.choice(controllerTypes)
+    return controllerTypes[np.random.randint(len(controllerTypes))]
 aggregates = FIXEDAGGPOP(AGGREGATE, num_cubes=num_cubes)
 controllers = POPULATION(GetNewController(), pop_size=N, unique=True)
 
@@ -86,8 +85,8 @@ timetotal = time()
 
 for g in range(latestGen, GENS+1):
     
-    #create a parent population
-    parent = deepcopy(coevolve.contrs)
+    #save the parent population
+    parent = coevolve.contrs.snapshot_genomes()
     
     #reset children's fitness values
     coevolve.reset()
@@ -3,7 +3,6 @@ import numpy as np
 import pickle
 from copy import deepcopy
 import os
-import networkx as nx #for enumerating polycube trees
 import enumeratePolycubes as ep
 
 from individual import INDIVIDUAL
@@ -90,9 +89,18 @@ class POPULATION:
         for i in range(len(self.p)):
             self.p[i].reset()
             
+    def snapshot_genomes(self):
+        """
+        copies the parts of each individual that mutation and evaluation change,
+        so the parents can be restored without copying the whole population
+        :return: list of (genome, id, fitness, scores) tuples, one per individual
+        """
+        return [(ind.controller.copy(), ind.id, ind.fitness, list(ind.scores)) for ind in self.p]
+            
     def hillclimber_selection(self, parent):
         """
         hill climber selection for genetic evolution
+        :param parent: snapshot_genomes() of the population before mutation
         :return: None
         """
         #print("Parents:")
@@ -100,14 +108,15 @@ class POPULATION:
         #print("_____________________________________________________")
         #print("Children:")
         #self.Print()
-        newpop = []
-        for i in range(len(parent.p)):
-            if parent.p[i].fitness >= self.p[i].fitness:
-                newpop.append(deepcopy(parent.p[i]))
+        for i, (genome, idNum, fitness, scores) in enumerate(parent):
+            if fitness >= self.p[i].fitness:
+                #swap the parent back in
+                self.p[i].controller = genome
+                self.p[i].id = idNum
+                self.p[i].fitness = fitness
+                self.p[i].scores = scores
             else:
-                newpop.append(deepcopy(self.p[i]))
                 print(i, "failed to outperform its parent")
-        self.p = deepcopy(newpop)
         #print("New Pop:")
         #self.Print()
           
@@ -238,11 +247,13 @@ class FIXEDAGGPOP(POPULATION):
         #calculate popsize - one for each possible internal tree for each polycube.
         #TODO: eliminate rotationally equivalent trees
         #print(self.morph_list)
+        #trees are enumerated once here and reused by initialize()
+        self.tree_list = []
         for polycube in self.morph_list:
             A = ep.polycube_to_graph(polycube, num_cubes)
-            G = nx.from_numpy_matrix(A)
-            edges = ep.get_edge_list(G)
-            trees = ep.brute_force_trees(num_cubes, edges)
+            edges = ep.get_edge_list(A)
+            trees = ep.enumerate_spanning_trees(num_cubes, edges)
+            self.tree_list.append(trees)
             self.popSize += len(trees)
         
         print(self.popSize, format(num_cubes) + "-cube morphologies enumerated.")
@@ -261,15 +272,9 @@ class FIXEDAGGPOP(POPULATION):
         
         popIndex = 0
         for i in range(len(self.morph_list)):
-            #select a structure and enumerate its articulations
+            #select a structure and its articulations
             polycube = self.morph_list[i]
-            num_cubes = len(polycube)
-            #print(polycube)
-            A = ep.polycube_to_graph(polycube, num_cubes)
-            #print(A)
-            G = nx.from_numpy_matrix(A)
-            edges = ep.get_edge_list(G)
-            trees = ep.brute_force_trees(num_cubes, edges)
+            trees = self.tree_list[i]
 
             #create morphology for each possible internal tree
             body_tree = {}
@@ -285,3 +290,5 @@ class FIXEDAGGPOP(POPULATION):
                 #the next aggregate has this morphology now.
                 self.p[popIndex].tree = body_tree
                 popIndex += 1
+        
+        assert popIndex == self.popSize, print('ERROR: filled %d of %d aggregates' % (popIndex, self.popSize))